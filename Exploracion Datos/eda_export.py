@@ -0,0 +1,95 @@
+import plotly.io as pio
+import os
+
+try:
+    import kaleido
+except ImportError:
+    kaleido = None
+
+# Configuration
+RENDERERS = 4      # Concurrent render tabs in the shared Chrome instance
+BATCH_SIZE = 50    # Figures held in memory before they are rendered
+DEFAULT_WIDTH = 700
+DEFAULT_HEIGHT = 500
+
+
+def _batch_capable():
+    # Kaleido >= 1.0 renders many figures through one browser; 0.2.x only has write_image
+    return kaleido is not None and hasattr(kaleido, "write_fig_from_object_sync")
+
+
+class FigureExporter:
+    """Batches static image exports through one persistent renderer.
+
+    With Kaleido >= 1.0 a single Chrome process is started on the first flush
+    and kept for the whole export, rendering `renderers` figures concurrently.
+    With older Kaleido the figures are written one by one through its own
+    persistent process. Use as a context manager so pending figures are
+    flushed and the renderer is stopped at the end.
+    """
+
+    def __init__(self, renderers=RENDERERS, batch_size=BATCH_SIZE):
+        self.renderers = renderers
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+        self._server_started = False
+
+    def add(self, fig, path, width=None, height=None, scale=1):
+        """Queue a figure; renders the current batch once it reaches `batch_size`."""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # Snapshot now so the caller can keep modifying or reuse the figure
+        self.pending.append({
+            "fig": fig.to_dict() if hasattr(fig, "to_dict") else fig,
+            "path": path,
+            "opts": {
+                "format": os.path.splitext(path)[1].lstrip(".") or "png",
+                "width": width or DEFAULT_WIDTH,
+                "height": height or DEFAULT_HEIGHT,
+                "scale": scale,
+            },
+        })
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+
+        if _batch_capable():
+            if not self._server_started:
+                # The server launches Chrome in a background thread, where a missing browser
+                # would leave this call waiting forever; constructing Kaleido here raises instead
+                kaleido.Kaleido(n=self.renderers)
+                kaleido.start_sync_server(n=self.renderers, silence_warnings=True)
+                self._server_started = True
+            kaleido.write_fig_from_object_sync(batch, cancel_on_error=True)
+        else:
+            for spec in batch:
+                opts = spec["opts"]
+                pio.write_image(spec["fig"], spec["path"], format=opts["format"],
+                                width=opts["width"], height=opts["height"], scale=opts["scale"])
+
+        self.written += len(batch)
+        print(f"Exported {self.written} images...", end='\r')
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._server_started:
+                kaleido.stop_sync_server()
+                self._server_started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._server_started:
+            kaleido.stop_sync_server()
+            self._server_started = False
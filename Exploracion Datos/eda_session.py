@@ -0,0 +1,173 @@
+import pandas as pd
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+import json
+import os
+import signal
+import sys
+import time
+
+# Configuration
+INPUT_FILE = "energy_results_MCmodel.csv"
+MANIFEST_FILE = "eda_output/.dataset_session.json"
+
+# Sessions attached by this process; kept alive so the DataFrames never outlive their buffers
+_ATTACHED = []
+
+
+def _open_block(name):
+    """Attach to an existing shared memory block without taking ownership of it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Before 3.13 every attaching process registers the block and unlinks it on exit
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def read_dataset(file_path=INPUT_FILE):
+    """Parse the CSV into typed columns: Time -> Time_Seconds, text columns -> category."""
+    df = pd.read_csv(file_path)
+    if 'Time' in df.columns:
+        print("Converting Time column...")
+        df['Time_Seconds'] = pd.to_timedelta(df.pop('Time'), errors='coerce').dt.total_seconds()
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        df[col] = df[col].astype('category')
+    return df
+
+
+class DatasetSession:
+    """The parsed dataset held once in named shared memory blocks.
+
+    The owner (`create`) copies every column into its own block and publishes a
+    small JSON manifest. Other steps and their worker processes `attach` to the
+    manifest and get a DataFrame backed directly by those blocks (read-only),
+    with categorical columns rebuilt from their shared integer codes.
+    """
+
+    def __init__(self, manifest, blocks, owner):
+        self.manifest = manifest
+        self.blocks = blocks
+        self.owner = owner
+
+    @classmethod
+    def create(cls, file_path=INPUT_FILE):
+        df = read_dataset(file_path)
+        manifest = {
+            "source": os.path.abspath(file_path),
+            "mtime": os.path.getmtime(file_path),
+            "rows": len(df),
+            "columns": [],
+        }
+        blocks = []
+        for col in df.columns:
+            series = df[col]
+            entry = {"name": col}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry["categories"] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+
+            shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            entry.update(shm=shm.name, dtype=values.dtype.str)
+            manifest["columns"].append(entry)
+            blocks.append(shm)
+        return cls(manifest, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, manifest=MANIFEST_FILE):
+        """Attach to a published session, given its manifest dict or manifest file."""
+        if not isinstance(manifest, dict):
+            with open(manifest) as f:
+                manifest = json.load(f)
+        blocks = []
+        try:
+            for entry in manifest["columns"]:
+                blocks.append(_open_block(entry["shm"]))
+        except FileNotFoundError:
+            for shm in blocks:
+                shm.close()
+            raise
+        return cls(manifest, blocks, owner=False)
+
+    def dataframe(self):
+        """Zero-copy DataFrame view over the shared columns."""
+        columns = {}
+        for entry, shm in zip(self.manifest["columns"], self.blocks):
+            values = np.ndarray((self.manifest["rows"],), dtype=np.dtype(entry["dtype"]), buffer=shm.buf)
+            values.flags.writeable = False
+            if "categories" in entry:
+                values = pd.Categorical.from_codes(values, categories=entry["categories"])
+            columns[entry["name"]] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def publish(self, manifest_path=MANIFEST_FILE):
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump(self.manifest, f)
+
+    def close(self, manifest_path=MANIFEST_FILE):
+        for shm in self.blocks:
+            shm.close()
+            if self.owner:
+                shm.unlink()
+        if self.owner and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_dataset(file_path=INPUT_FILE, manifest_path=MANIFEST_FILE):
+    """Return the full dataset, from a running session if one serves this file.
+
+    Falls back to parsing the CSV (same columns and types) when no session is
+    running, the manifest is stale, or it was built from another file/version.
+    """
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        fresh = (manifest["source"] == os.path.abspath(file_path)
+                 and os.path.exists(file_path)
+                 and manifest["mtime"] == os.path.getmtime(file_path))
+        if fresh:
+            try:
+                session = DatasetSession.attach(manifest)
+            except FileNotFoundError:
+                print(f"Dataset session in {manifest_path} is no longer running, reading CSV...")
+            else:
+                _ATTACHED.append(session)
+                print(f"Attached to dataset session ({manifest['rows']} rows)")
+                return session.dataframe()
+        else:
+            print(f"Dataset session does not match {file_path}, reading CSV...")
+
+    print(f"Loading {file_path}...")
+    return read_dataset(file_path)
+
+
+def serve(file_path=INPUT_FILE):
+    """Hold the dataset in shared memory until interrupted (Ctrl+C or SIGTERM)."""
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"Loading {file_path} into shared memory...")
+    with DatasetSession.create(file_path) as session:
+        session.publish()
+        size_mb = sum(shm.size for shm in session.blocks) / 1e6
+        print(f"Serving {session.manifest['rows']} rows ({size_mb:.0f} MB) via {MANIFEST_FILE}. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("\nStopping dataset session...")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else INPUT_FILE)
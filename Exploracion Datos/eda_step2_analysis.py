@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 import os
+from eda_export import FigureExporter
 
 # Configuration
 FILE_PATH = "energy_results_MCmodel.csv"
@@ -70,31 +71,33 @@ def process_data():
     # --- Visualizations ---
     print("Generating plots...")
     
-    # 1. Correlation Heatmap
-    numeric_cols = full_sample.select_dtypes(include=[np.number]).columns
-    # Drop columns that are completely empty or constant in sample if any
-    valid_numeric = full_sample[numeric_cols].dropna(axis=1, how='all')
+    # Figures are queued and rendered together through one renderer when the block ends
+    with FigureExporter() as exporter:
+        # 1. Correlation Heatmap
+        numeric_cols = full_sample.select_dtypes(include=[np.number]).columns
+        # Drop columns that are completely empty or constant in sample if any
+        valid_numeric = full_sample[numeric_cols].dropna(axis=1, how='all')
     
-    if not valid_numeric.empty:
-        corr = valid_numeric.corr()
-        fig_corr = px.imshow(corr, text_auto=True, title="Correlation Matrix (Sampled Data)", template="plotly_dark")
-        fig_corr.write_image(f"{OUTPUT_DIR}/correlation_matrix.png", width=1200, height=1000)
+        if not valid_numeric.empty:
+            corr = valid_numeric.corr()
+            fig_corr = px.imshow(corr, text_auto=True, title="Correlation Matrix (Sampled Data)", template="plotly_dark")
+            exporter.add(fig_corr, f"{OUTPUT_DIR}/correlation_matrix.png", width=1200, height=1000)
     
-    # 2. Key Distributions
-    # Power Distribution
-    if 'Power_battery_1' in full_sample.columns:
-        fig_hist = px.histogram(full_sample, x="Power_battery_1", nbins=50, title="Distribution of Power (Battery 1)", template="plotly_dark")
-        fig_hist.write_image(f"{OUTPUT_DIR}/power_dist_bat1.png")
+        # 2. Key Distributions
+        # Power Distribution
+        if 'Power_battery_1' in full_sample.columns:
+            fig_hist = px.histogram(full_sample, x="Power_battery_1", nbins=50, title="Distribution of Power (Battery 1)", template="plotly_dark")
+            exporter.add(fig_hist, f"{OUTPUT_DIR}/power_dist_bat1.png")
 
-    # SOC Relationship
-    if 'SOC_battery_1' in full_sample.columns and 'SOC_battery_2' in full_sample.columns:
-        fig_soc = px.scatter(full_sample, x="SOC_battery_1", y="SOC_battery_2", title="SOC Battery 1 vs Battery 2", template="plotly_dark")
-        fig_soc.write_image(f"{OUTPUT_DIR}/soc_scatter.png")
+        # SOC Relationship
+        if 'SOC_battery_1' in full_sample.columns and 'SOC_battery_2' in full_sample.columns:
+            fig_soc = px.scatter(full_sample, x="SOC_battery_1", y="SOC_battery_2", title="SOC Battery 1 vs Battery 2", template="plotly_dark")
+            exporter.add(fig_soc, f"{OUTPUT_DIR}/soc_scatter.png")
         
-    # Vehicle Speed Profile (Sample of one cycle or just distribution)
-    if 'vehicle_speed' in full_sample.columns:
-         fig_speed = px.histogram(full_sample, x="vehicle_speed", title="Vehicle Speed Distribution", template="plotly_dark")
-         fig_speed.write_image(f"{OUTPUT_DIR}/speed_dist.png")
+        # Vehicle Speed Profile (Sample of one cycle or just distribution)
+        if 'vehicle_speed' in full_sample.columns:
+             fig_speed = px.histogram(full_sample, x="vehicle_speed", title="Vehicle Speed Distribution", template="plotly_dark")
+             exporter.add(fig_speed, f"{OUTPUT_DIR}/speed_dist.png")
 
     # Save sample for further quick inspection if needed
     full_sample.to_csv(f"{OUTPUT_DIR}/eda_sample.csv", index=False)
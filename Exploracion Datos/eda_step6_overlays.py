@@ -1,6 +1,7 @@
 import pandas as pd
 import plotly.graph_objects as go
 import os
+from eda_session import load_dataset
 
 # Configuration
 INPUT_FILE = "energy_results_MCmodel.csv"
@@ -12,11 +13,8 @@ if not os.path.exists(OUTPUT_DIR):
 
 def generate_overlays():
     print(f"Loading dataset for Overlay Analysis...")
-    df = pd.read_csv(INPUT_FILE)
-    
-    # Process Time
-    if 'Time' in df.columns:
-        df['Time_Seconds'] = pd.to_timedelta(df['Time'], errors='coerce').dt.total_seconds()
+    # Parsed once (Time_Seconds included), shared with other steps via eda_session.py
+    df = load_dataset(INPUT_FILE)
         
     cycles = sorted(df['cycle'].unique())
     print(f"Total Cycles: {len(cycles)}")
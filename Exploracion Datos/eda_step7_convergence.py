@@ -0,0 +1,338 @@
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from statistics import NormalDist
+import bisect
+import math
+import os
+import random
+
+# Configuration
+INPUT_FILE = "energy_results_MCmodel.csv"
+OUTPUT_DIR = "eda_output/convergence"
+CHUNK_SIZE = 100000     # Rows per chunk to process
+TOLERANCE = 0.01        # Target relative CI half-width (1% of the estimate)
+CONFIDENCE = 0.95       # Confidence level of the intervals
+MIN_CYCLES = 20         # Never declare convergence before this many cycles
+PATIENCE = 5            # Consecutive cycles that must stay within tolerance
+QUANTILES = [0.05, 0.5, 0.95]  # Range-distribution quantiles to track
+EARLY_STOP = True       # Stop reading the file once converged ("cycle" layout only)
+SHUFFLE_SEED = 42       # Order in which "time" layout cycles are fed to the tracker
+# How rows are ordered in the file, which decides when a cycle is complete:
+#   "time"  - all cycles interleaved and sorted by Time (the MC model output).
+#             Cycles complete in order of duration, which is not independent of the
+#             metrics, so the whole file is read and cycles are fed in random order.
+#   "cycle" - each cycle written in full before the next one (e.g. a running simulation).
+#             Arrival order is independent of the metrics, so the scan can stop early.
+FILE_LAYOUT = "time"
+
+# Per-cycle metrics tracked by the estimator
+METRICS = {
+    "end_soc": "End-of-cycle SOC",
+    "energy_kwh": "Energy Use (kWh)",
+    "range": "Range per Full Charge",
+}
+
+if not os.path.exists(OUTPUT_DIR):
+    os.makedirs(OUTPUT_DIR)
+
+
+class ConvergenceTracker:
+    """Streaming Monte Carlo estimates updated one finished cycle at a time.
+
+    Means use Welford's online algorithm with a normal CI; quantiles of the
+    range distribution use distribution-free order-statistic CIs. Convergence
+    is declared once every CI half-width, relative to its estimate, stays
+    below `tolerance` for `patience` consecutive cycles.
+    """
+
+    def __init__(self, tolerance=TOLERANCE, confidence=CONFIDENCE,
+                 min_cycles=MIN_CYCLES, patience=PATIENCE, quantiles=QUANTILES):
+        self.tolerance = tolerance
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.min_cycles = min_cycles
+        self.patience = patience
+        self.quantiles = quantiles
+
+        self.n = 0
+        self.count = {m: 0 for m in METRICS}  # Cycles where the metric is defined
+        self.mean = {m: 0.0 for m in METRICS}
+        self.m2 = {m: 0.0 for m in METRICS}
+        self.sorted_range = []
+        self.streak = 0
+        self.converged_at = None
+        self.history = []
+
+    def add_cycle(self, summary):
+        """Update estimates with one cycle summary. Returns True once converged.
+
+        Metrics that are undefined for the cycle (NaN, e.g. range without SOC
+        drop) are left out of that metric's estimates only.
+        """
+        self.n += 1
+        for m in METRICS:
+            if not np.isfinite(summary[m]):
+                continue
+            self.count[m] += 1
+            delta = summary[m] - self.mean[m]
+            self.mean[m] += delta / self.count[m]
+            self.m2[m] += delta * (summary[m] - self.mean[m])
+        if np.isfinite(summary["range"]):
+            bisect.insort(self.sorted_range, summary["range"])
+
+        estimates = self.estimates()
+        within = all(e["rel_halfwidth"] <= self.tolerance for e in estimates.values())
+        self.streak = self.streak + 1 if within else 0
+        if self.converged_at is None and self.n >= self.min_cycles and self.streak >= self.patience:
+            self.converged_at = self.n
+
+        row = {"n_cycles": self.n, "cycle": summary["cycle"]}
+        for name, e in estimates.items():
+            row[f"{name}_est"] = e["estimate"]
+            row[f"{name}_lo"] = e["ci_low"]
+            row[f"{name}_hi"] = e["ci_high"]
+            row[f"{name}_rel_hw"] = e["rel_halfwidth"]
+        self.history.append(row)
+        return self.converged
+
+    def add_cycle_frame(self, cycle_id, cycle_df):
+        """Convenience entry point for a running simulation that yields whole cycles."""
+        acc = CycleAccumulator()
+        acc.add_chunk(cycle_df.assign(cycle=cycle_id))
+        return self.add_cycle(acc.summary(cycle_id))
+
+    @property
+    def converged(self):
+        return self.converged_at is not None
+
+    def estimates(self):
+        out = {}
+        for m in METRICS:
+            n = self.count[m]
+            if n == 0:
+                out[f"mean_{m}"] = self._entry(math.nan, -math.inf, math.inf)
+                continue
+            var = self.m2[m] / (n - 1) if n > 1 else math.inf
+            hw = self.z * math.sqrt(var / n)
+            out[f"mean_{m}"] = self._entry(self.mean[m], self.mean[m] - hw, self.mean[m] + hw)
+
+        values = np.asarray(self.sorted_range)
+        n = len(values)
+        for q in self.quantiles:
+            if n == 0:
+                out[f"range_p{int(q * 100):02d}"] = self._entry(math.nan, -math.inf, math.inf)
+                continue
+            # Order-statistic CI: ranks n*q -/+ z*sqrt(n*q*(1-q)) (normal approx. to binomial)
+            spread = self.z * math.sqrt(n * q * (1 - q))
+            lo_idx = max(0, math.floor(n * q - spread))
+            hi_idx = min(n - 1, math.ceil(n * q + spread))
+            est = float(np.quantile(values, q))
+            out[f"range_p{int(q * 100):02d}"] = self._entry(est, values[lo_idx], values[hi_idx])
+        return out
+
+    @staticmethod
+    def _entry(estimate, low, high):
+        hw = (high - low) / 2
+        rel = hw / abs(estimate) if estimate != 0 and np.isfinite(estimate) else math.inf
+        return {"estimate": estimate, "ci_low": float(low), "ci_high": float(high), "rel_halfwidth": rel}
+
+    def report(self):
+        lines = [f"Cycles analysed: {self.n} ({self.count['range']} with an SOC drop, used for range)"]
+        if self.converged:
+            lines.append(f"Converged at cycle #{self.converged_at} (tolerance {self.tolerance:.2%})")
+        else:
+            lines.append(f"NOT converged (tolerance {self.tolerance:.2%})")
+        for name, e in self.estimates().items():
+            lines.append(f"  {name:<16} {e['estimate']:>14.6f}  CI [{e['ci_low']:.6f}, {e['ci_high']:.6f}]"
+                         f"  rel. half-width {e['rel_halfwidth']:.3%}")
+        return "\n".join(lines)
+
+
+class CycleAccumulator:
+    """Folds chunks of raw rows into small per-cycle partial aggregates."""
+
+    def __init__(self):
+        self.partials = {}
+
+    def add_chunk(self, chunk):
+        """Accumulate a chunk and return the set of cycle ids seen in it."""
+        if 'Time_Seconds' not in chunk.columns:
+            chunk = chunk.assign(Time_Seconds=pd.to_timedelta(chunk['Time'], errors='coerce').dt.total_seconds())
+        if 'Execution_cycle' not in chunk.columns:
+            chunk = chunk.assign(Execution_cycle=0)  # Treat the whole cycle as one trip
+        chunk = chunk.sort_values(['cycle', 'Time_Seconds'], kind='stable')
+
+        # Time step per row, seeded with the last time seen for the cycle in previous chunks
+        prev_time = chunk.groupby('cycle')['Time_Seconds'].shift()
+        seed = chunk['cycle'].map({c: p['last_time'] for c, p in self.partials.items()})
+        dt = prev_time.fillna(seed)
+        dt = (chunk['Time_Seconds'] - dt).fillna(0.0)
+        soc = (chunk['SOC_battery_1'] + chunk['SOC_battery_2']) / 2
+
+        work = pd.DataFrame({
+            'cycle': chunk['cycle'],
+            'time': chunk['Time_Seconds'],
+            'dt': dt,
+            'soc': soc,
+            'energy_j': (chunk['Power_battery_1'] + chunk['Power_battery_2']) * dt,
+        })
+        grouped = work.groupby('cycle').agg(
+            first_time=('time', 'first'), first_soc=('soc', 'first'),
+            last_time=('time', 'last'), last_soc=('soc', 'last'), last_dt=('dt', 'last'),
+            energy_j=('energy_j', 'sum'), rows=('time', 'size'),
+        )
+        # `distance` is the cumulative trip distance, reset at every Execution_cycle,
+        # so a trip's length is its largest value and only those add up
+        trips = chunk.groupby(['cycle', 'Execution_cycle'])['distance'].max()
+
+        for cid, g in grouped.iterrows():
+            p = self.partials.get(cid)
+            if p is None:
+                p = self.partials[cid] = dict(g.to_dict(), trips={})
+            else:
+                p['last_time'], p['last_soc'], p['last_dt'] = g['last_time'], g['last_soc'], g['last_dt']
+                p['energy_j'] += g['energy_j']
+                p['rows'] += g['rows']
+            for trip, dist in trips.loc[cid].items():
+                p['trips'][trip] = max(p['trips'].get(trip, 0.0), dist)
+        return set(grouped.index)
+
+    def pop(self, cycle_id):
+        summary = self.summary(cycle_id)
+        del self.partials[cycle_id]
+        return summary
+
+    def summary(self, cycle_id):
+        p = self.partials[cycle_id]
+        soc_drop = p['first_soc'] - p['last_soc']
+        distance = sum(p['trips'].values())
+        return {
+            "cycle": cycle_id,
+            "end_soc": p['last_soc'],
+            "energy_kwh": p['energy_j'] / 3.6e6,
+            # Distance achievable on a full charge, extrapolated from this cycle's SOC use
+            "range": distance / soc_drop if soc_drop > 0 else np.nan,
+            "distance": distance,
+            "rows": p['rows'],
+        }
+
+
+def stream_cycles(file_path=INPUT_FILE, chunk_size=CHUNK_SIZE, layout=FILE_LAYOUT):
+    """Yield each cycle's summary exactly once, as soon as the cycle is complete.
+
+    With layout "cycle", a cycle is complete as soon as the next cycle starts.
+    With layout "time" (rows sorted by Time across cycles), a cycle is complete
+    once the file's time has moved past the cycle's last row by more than its
+    time step, i.e. a running cycle would already have produced another row.
+    Cycles then complete in order of their duration (shorter cycles first), so
+    their order must not be used as a random sample; see `run_convergence`.
+    Both rules are independent of `chunk_size`. Open cycles are flushed at EOF.
+    """
+    if layout not in ("time", "cycle"):
+        raise ValueError(f"Unknown layout {layout!r}, expected 'time' or 'cycle'")
+
+    acc = CycleAccumulator()
+    done = set()
+    watermark = -math.inf  # Latest time read so far ("time" layout)
+    step = 0.0             # Largest time step seen, for cycles with a single row so far
+    usecols = ['cycle', 'Execution_cycle', 'Time', 'distance', 'SOC_battery_1', 'SOC_battery_2',
+               'Power_battery_1', 'Power_battery_2']
+    for i, chunk in enumerate(pd.read_csv(file_path, usecols=usecols, chunksize=chunk_size)):
+        print(f"Processed chunk {i+1}...", end='\r')
+        chunk = chunk.assign(Time_Seconds=pd.to_timedelta(chunk['Time'], errors='coerce').dt.total_seconds())
+
+        if layout == "time" and chunk['Time_Seconds'].min() < watermark:
+            raise ValueError("Rows are not sorted by Time; set FILE_LAYOUT = 'cycle' if cycles are written one after another")
+        reappeared = done & set(chunk['cycle'].unique())
+        if reappeared:
+            raise ValueError(f"Cycles {sorted(reappeared)} continue after being completed; "
+                             f"rows do not follow FILE_LAYOUT = {layout!r}")
+
+        if layout == "time":
+            acc.add_chunk(chunk)
+            watermark = chunk['Time_Seconds'].max()
+            step = max([step] + [p['last_dt'] for p in acc.partials.values()])
+            finished = [cid for cid, p in acc.partials.items()
+                        if watermark > p['last_time'] + 1.5 * (p['last_dt'] or step)]
+        else:
+            runs = chunk['cycle'].ne(chunk['cycle'].shift()).sum()
+            if runs > chunk['cycle'].nunique():
+                raise ValueError("Cycles are interleaved; set FILE_LAYOUT = 'time'")
+            acc.add_chunk(chunk)
+            current = chunk['cycle'].iloc[-1]
+            finished = [cid for cid in acc.partials if cid != current]
+
+        for cid in sorted(finished):
+            done.add(cid)
+            yield acc.pop(cid)
+    for cid in sorted(acc.partials):
+        yield acc.pop(cid)
+
+
+def plot_history(history, output_path):
+    names = [c[:-4] for c in history.columns if c.endswith('_est')]
+    fig = make_subplots(rows=len(names), cols=1, shared_xaxes=True,
+                        vertical_spacing=0.03, subplot_titles=names)
+    for row, name in enumerate(names, start=1):
+        x = history['n_cycles']
+        fig.add_trace(go.Scatter(x=x, y=history[f'{name}_hi'], line=dict(width=0),
+                                 showlegend=False, hoverinfo='skip'), row=row, col=1)
+        fig.add_trace(go.Scatter(x=x, y=history[f'{name}_lo'], line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(0,240,255,0.2)', showlegend=False, hoverinfo='skip'),
+                      row=row, col=1)
+        fig.add_trace(go.Scatter(x=x, y=history[f'{name}_est'], name=name,
+                                 line=dict(color='#00F0FF', width=1.5)), row=row, col=1)
+
+    fig.update_layout(
+        title="Monte Carlo Convergence: Running Estimates and Confidence Intervals",
+        template="plotly_dark",
+        height=250 * len(names),
+        showlegend=False,
+    )
+    fig.update_xaxes(title_text="Cycles analysed", row=len(names), col=1)
+    fig.write_html(output_path)
+
+
+def run_convergence():
+    print(f"Streaming cycles from {INPUT_FILE}...")
+    tracker = ConvergenceTracker()
+
+    summaries = stream_cycles()
+    early_stop = EARLY_STOP and FILE_LAYOUT == "cycle"
+    if FILE_LAYOUT == "time":
+        # Completion order is biased by duration: read every cycle, then feed them in
+        # random order. `converged_at` is then the number of MC runs that would have been
+        # enough, which is what can be cut from future simulations.
+        summaries = list(summaries)
+        random.Random(SHUFFLE_SEED).shuffle(summaries)
+        print(f"\nRead {len(summaries)} cycles, feeding them in random order (seed {SHUFFLE_SEED})...")
+
+    for summary in summaries:
+        tracker.add_cycle(summary)
+        if tracker.converged_at == tracker.n:
+            print(f"\nConverged after {tracker.n} cycles (tolerance {TOLERANCE:.2%}).")
+            if early_stop:
+                break
+
+    if tracker.n == 0:
+        print("\nNo complete cycles found!")
+        return
+
+    print()
+    report = tracker.report()
+    print(report)
+
+    with open(f"{OUTPUT_DIR}/convergence_summary.txt", "w") as f:
+        f.write("=== Monte Carlo Convergence Report ===\n")
+        f.write(f"Confidence: {CONFIDENCE:.0%}, Min cycles: {MIN_CYCLES}, Patience: {PATIENCE}\n")
+        f.write(report + "\n")
+
+    history = pd.DataFrame(tracker.history)
+    history.to_csv(f"{OUTPUT_DIR}/convergence_history.csv", index=False)
+    plot_history(history, f"{OUTPUT_DIR}/convergence_history.html")
+    print(f"Outputs saved to {OUTPUT_DIR}/")
+
+
+if __name__ == "__main__":
+    run_convergence()
@@ -0,0 +1,255 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+# Configuration
+INPUT_FILE = "energy_results_MCmodel.csv"
+ROLLUP_DIR = "eda_output/rollups"
+CHUNK_SIZE = 100000   # Rows per chunk to process
+MERGE_EVERY = 10      # Chunks of partial leaves held before folding them into the index
+POWER_BINS = np.linspace(-200000, 400000, 601)  # 1 kW bins for total battery power (W)
+POWER_QUANTILES = [0.05, 0.5, 0.95]
+HIST_DTYPE = np.int32  # Row counts per leaf and bin; keeps the leaf histograms at half size
+UNKNOWN_ROUTE = "<unknown>"  # Route name used for rows with a missing Route
+
+KEYS = ['cycle', 'Execution_cycle', 'route_code']
+SUM_COLS = ['rows', 'time_s', 'energy_j', 'soc_drop']
+# `distance` is the cumulative trip distance, reset at every Execution_cycle: a leaf
+# keeps its largest value (the trip length), and only those add up across leaves
+LEVEL_COLS = SUM_COLS + ['distance']
+USECOLS = ['cycle', 'Execution_cycle', 'Route', 'Time', 'distance',
+           'SOC_battery_1', 'SOC_battery_2', 'Power_battery_1', 'Power_battery_2']
+
+# Rollup levels built from the leaf table (cycle x Execution_cycle x Route)
+LEVELS = {
+    "route": ['route_code'],
+    "execution_cycle": ['Execution_cycle'],
+    "cycle": ['cycle'],
+}
+
+
+def power_quantiles(hist, quantiles=POWER_QUANTILES):
+    """Quantiles (linearly interpolated inside bins) from rows of power histograms."""
+    hist = np.atleast_2d(hist)
+    cum = np.cumsum(hist, axis=1)
+    total = cum[:, -1:]
+    out = np.full((hist.shape[0], len(quantiles)), np.nan)
+    for j, q in enumerate(quantiles):
+        target = q * total[:, 0]
+        idx = np.array([np.searchsorted(c, t) for c, t in zip(cum, target)])
+        idx = np.minimum(idx, hist.shape[1] - 1)
+        below = np.where(idx > 0, cum[np.arange(len(idx)), idx - 1], 0)
+        in_bin = hist[np.arange(len(idx)), idx]
+        frac = np.divide(target - below, in_bin, out=np.zeros_like(target, dtype=float), where=in_bin > 0)
+        out[:, j] = POWER_BINS[idx] + frac * (POWER_BINS[idx + 1] - POWER_BINS[idx])
+    out[total[:, 0] == 0] = np.nan
+    return out
+
+
+def merge_leaves(frames, hists):
+    """Merge partial leaf aggregates (and their aligned histograms) by key."""
+    leaf = pd.concat(frames, ignore_index=True)
+    hist = np.concatenate(hists)
+    gid = leaf.groupby(KEYS, sort=True).ngroup().to_numpy()
+
+    merged_hist = np.zeros((gid.max() + 1, hist.shape[1]), dtype=HIST_DTYPE)
+    np.add.at(merged_hist, gid, hist)
+
+    merged = leaf.groupby(KEYS, sort=True).agg(
+        {**{c: 'sum' for c in SUM_COLS}, 'distance': 'max', 'first_time': 'min', 'last_time': 'max'}
+    ).reset_index()
+    return merged, merged_hist
+
+
+class RollupIndex:
+    """Pre-aggregated route / Execution_cycle / cycle tables over the MC dataset.
+
+    `Route` is dictionary-encoded into `route_code`. The leaf table keeps one
+    row per (cycle, Execution_cycle, route_code) with additive sums and a power
+    histogram, so every level is a cheap group-by of the leaves and new cycles
+    can be merged in without rescanning the original file.
+    """
+
+    def __init__(self, routes=None, leaf=None, leaf_hist=None, cycle_state=None):
+        self.routes = routes if routes is not None else {}
+        self.leaf = leaf
+        self.leaf_hist = leaf_hist
+        # Last time and SOC per cycle, so appended rows can continue a cycle
+        if cycle_state is None:
+            cycle_state = pd.DataFrame({'time': pd.Series(dtype=float), 'soc': pd.Series(dtype=float)})
+        self.cycle_state = cycle_state
+        self.tables = {}
+        if leaf is not None:
+            self._build_levels()
+
+    # --- Building ---
+    @classmethod
+    def build(cls, file_path=INPUT_FILE, chunk_size=CHUNK_SIZE):
+        index = cls()
+        index.append(file_path, chunk_size)
+        return index
+
+    def append(self, file_path, chunk_size=CHUNK_SIZE):
+        """Scan a (new) CSV file and merge its rows into the rollups.
+
+        Rows are not deduplicated: appending the same file twice (or a file that
+        overlaps data already in the index) counts those rows twice.
+        """
+        frames, hists = [], []
+        if self.leaf is not None:
+            frames.append(self.leaf)
+            hists.append(self.leaf_hist)
+
+        chunk_iter = pd.read_csv(file_path, usecols=USECOLS, dtype={'Route': 'category'}, chunksize=chunk_size)
+        for i, chunk in enumerate(chunk_iter):
+            print(f"Processing chunk {i+1}...", end='\r')
+            leaf, hist = self._aggregate_chunk(chunk)
+            frames.append(leaf)
+            hists.append(hist)
+            # Fold partials into the running leaves regularly so memory stays bounded
+            if len(frames) > MERGE_EVERY:
+                merged_leaf, merged_hist = merge_leaves(frames, hists)
+                frames, hists = [merged_leaf], [merged_hist]
+        print()
+
+        self.leaf, self.leaf_hist = merge_leaves(frames, hists)
+        self._build_levels()
+
+    def _encode_routes(self, route):
+        for name in route.cat.categories:
+            if name not in self.routes:
+                self.routes[name] = len(self.routes)
+        lookup = np.array([self.routes[name] for name in route.cat.categories], dtype=np.int32)
+        codes = route.cat.codes.to_numpy()
+        missing = codes == -1
+        encoded = np.empty(len(codes), dtype=np.int32)
+        encoded[~missing] = lookup[codes[~missing]]
+        if missing.any():
+            # Missing routes get their own entry instead of wrapping to lookup[-1]
+            encoded[missing] = self.routes.setdefault(UNKNOWN_ROUTE, len(self.routes))
+        return encoded
+
+    def _aggregate_chunk(self, chunk):
+        chunk = chunk.assign(
+            Time_Seconds=pd.to_timedelta(chunk['Time'], errors='coerce').dt.total_seconds(),
+            route_code=self._encode_routes(chunk['Route']),
+            soc=(chunk['SOC_battery_1'] + chunk['SOC_battery_2']) / 2,
+        )
+        chunk = chunk.sort_values(['cycle', 'Time_Seconds'], kind='stable')
+
+        # Row-to-row time step and SOC drop, seeded with the cycle's last row from previous chunks.
+        # Both are additive, so they can be summed at any rollup level.
+        by_cycle = chunk.groupby('cycle')
+        prev_time = by_cycle['Time_Seconds'].shift().fillna(chunk['cycle'].map(self.cycle_state['time']).astype(float))
+        prev_soc = by_cycle['soc'].shift().fillna(chunk['cycle'].map(self.cycle_state['soc']).astype(float))
+        dt = (chunk['Time_Seconds'] - prev_time).fillna(0.0)
+        soc_drop = (prev_soc - chunk['soc']).fillna(0.0)
+        tail = by_cycle[['Time_Seconds', 'soc']].last().rename(columns={'Time_Seconds': 'time'})
+        self.cycle_state = tail.combine_first(self.cycle_state)
+        power = chunk['Power_battery_1'] + chunk['Power_battery_2']
+
+        work = pd.DataFrame({
+            'cycle': chunk['cycle'],
+            'Execution_cycle': chunk['Execution_cycle'],
+            'route_code': chunk['route_code'],
+            'time': chunk['Time_Seconds'],
+            'dt': dt,
+            'energy_j': power * dt,
+            'distance': chunk['distance'],
+            'soc_drop': soc_drop,
+        })
+        grouped = work.groupby(KEYS, sort=True)
+        leaf = grouped.agg(
+            rows=('time', 'size'), time_s=('dt', 'sum'),
+            energy_j=('energy_j', 'sum'), distance=('distance', 'max'),
+            soc_drop=('soc_drop', 'sum'),
+            first_time=('time', 'min'), last_time=('time', 'max'),
+        ).reset_index()
+
+        # NaN power would sort past the last edge and be clipped into the top bin
+        power = power.to_numpy()
+        valid = np.isfinite(power)
+        bins = np.clip(np.searchsorted(POWER_BINS, power[valid], side='right') - 1, 0, len(POWER_BINS) - 2)
+        hist = np.zeros((len(leaf), len(POWER_BINS) - 1), dtype=HIST_DTYPE)
+        np.add.at(hist, (grouped.ngroup().to_numpy()[valid], bins), 1)
+        return leaf, hist
+
+    def _build_levels(self):
+        names = {code: name for name, code in self.routes.items()}
+        for level, keys in LEVELS.items():
+            gid = self.leaf.groupby(keys, sort=True).ngroup().to_numpy()
+            hist = np.zeros((gid.max() + 1, self.leaf_hist.shape[1]), dtype=np.int64)
+            np.add.at(hist, gid, self.leaf_hist)
+
+            table = self.leaf.groupby(keys, sort=True)[LEVEL_COLS].sum().reset_index()
+            table['energy_kwh'] = table.pop('energy_j') / 3.6e6
+            q = power_quantiles(hist)
+            for j, p in enumerate(POWER_QUANTILES):
+                table[f'power_p{int(p * 100):02d}'] = q[:, j]
+            if level == "route":
+                table.insert(1, 'Route', table['route_code'].map(names))
+                table = table.set_index('Route')
+            self.tables[level] = table
+
+    # --- Queries ---
+    def route_summary(self, routes=None):
+        table = self.tables["route"]
+        return table if routes is None else table.loc[list(routes)]
+
+    def compare_routes(self, route_a, route_b):
+        """Side-by-side route stats plus per-distance / average power figures and their difference."""
+        table = self.route_summary([route_a, route_b]).copy()
+        table['kwh_per_distance'] = table['energy_kwh'] / table['distance']
+        table['soc_drop_per_distance'] = table['soc_drop'] / table['distance']
+        table['avg_power_w'] = table['energy_kwh'] * 3.6e6 / table['time_s']
+        out = table.drop(columns='route_code').T
+        out['difference'] = out[route_b] - out[route_a]
+        return out
+
+    # --- Persistence ---
+    def save(self, rollup_dir=ROLLUP_DIR):
+        if not os.path.exists(rollup_dir):
+            os.makedirs(rollup_dir)
+        pd.DataFrame({'Route': list(self.routes), 'route_code': list(self.routes.values())}) \
+            .to_csv(f"{rollup_dir}/routes.csv", index=False)
+        self.leaf.to_csv(f"{rollup_dir}/leaf.csv", index=False)
+        np.save(f"{rollup_dir}/leaf_power_hist.npy", self.leaf_hist)
+        self.cycle_state.to_csv(f"{rollup_dir}/cycle_state.csv", index_label='cycle')
+        for level, table in self.tables.items():
+            table.to_csv(f"{rollup_dir}/{level}_rollup.csv")
+
+    @classmethod
+    def load(cls, rollup_dir=ROLLUP_DIR):
+        routes = pd.read_csv(f"{rollup_dir}/routes.csv")
+        leaf = pd.read_csv(f"{rollup_dir}/leaf.csv")
+        leaf_hist = np.load(f"{rollup_dir}/leaf_power_hist.npy").astype(HIST_DTYPE, copy=False)
+        cycle_state = pd.read_csv(f"{rollup_dir}/cycle_state.csv", index_col='cycle')
+        return cls(dict(zip(routes['Route'], routes['route_code'])), leaf, leaf_hist, cycle_state)
+
+
+def build_rollups():
+    """Build the rollups from INPUT_FILE, or merge an appended file into existing ones.
+
+    Usage: python eda_step8_rollups.py [new_cycles.csv]
+    Each appended file must only be passed once, its rows are not deduplicated.
+    """
+    if len(sys.argv) > 1:
+        if not os.path.exists(f"{ROLLUP_DIR}/leaf.csv"):
+            sys.exit(f"Error: no rollups in {ROLLUP_DIR} to append {sys.argv[1]} to. "
+                     f"Run without arguments first to build them from {INPUT_FILE}.")
+        print(f"Appending {sys.argv[1]} to rollups in {ROLLUP_DIR}...")
+        index = RollupIndex.load()
+        index.append(sys.argv[1])
+    else:
+        print(f"Building rollups from {INPUT_FILE}...")
+        index = RollupIndex.build()
+
+    index.save()
+    print(f"Routes: {len(index.routes)}, leaves: {len(index.leaf)}")
+    print(index.route_summary().to_string())
+    print(f"Rollups saved to {ROLLUP_DIR}/")
+
+
+if __name__ == "__main__":
+    build_rollups()